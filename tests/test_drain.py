@@ -0,0 +1,60 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+from app import DrainState, ProxyConfig
+
+
+class FakeUpstream:
+    """按行返回DeepSider格式流式数据的上游响应，读取时记录进行中的请求数"""
+
+    status_code = 200
+
+    def __init__(self, seen):
+        self.seen = seen
+
+    def iter_content(self, chunk_size=None):
+        self.seen.append(app.drain_state.active_requests)
+        yield ("data: " + json.dumps({"code": 202, "data": {"type": "chat", "content": "hi"}}) + "\n").encode()
+        self.seen.append(app.drain_state.active_requests)
+        yield b'data: {"code": 203}\n'
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, "drain_state", DrainState())
+    monkeypatch.setattr(app, "PROXY_CONFIG", ProxyConfig())
+    return TestClient(app.app)
+
+
+def test_draining_rejects_requests_and_fails_health(client):
+    assert client.get("/health").status_code == 200
+    headers = {"authorization": "Bearer token"}
+    assert client.get("/v1/models", headers=headers).status_code == 200
+
+    app.drain_state.draining = True
+    response = client.get("/v1/models", headers=headers)
+    assert response.status_code == 503
+    assert response.headers["connection"] == "close"
+    assert response.json()["error"]["code"] == "draining"
+    assert client.get("/health").status_code == 503
+
+
+def test_streaming_response_counted_until_sent(client, monkeypatch):
+    seen = []
+    monkeypatch.setattr(app.PROXY_CONFIG.session, "post", lambda *args, **kwargs: FakeUpstream(seen))
+    response = client.post("/v1/chat/completions", headers={"authorization": "Bearer token"}, json={
+        "model": "gpt-4o",
+        "stream": True,
+        "messages": [{"role": "user", "content": "hello"}]
+    })
+    assert response.status_code == 200
+    assert response.text.endswith("data: [DONE]\n\n")
+    # 路由函数返回后流式响应仍在发送，期间一直计入进行中的请求
+    assert seen == [1, 1]
+    assert app.drain_state.active_requests == 0
@@ -0,0 +1,158 @@
+import base64
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+from app import BlobStore, InlineImageOffloader, etag_matches, parse_byte_range
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(str(tmp_path), 10 * 1024 * 1024, 3600)
+
+
+def run(offloader, chunks):
+    output = "".join(offloader.feed(chunk) for chunk in chunks)
+    return output + offloader.flush()
+
+
+def stored_bytes(store, output):
+    digest = output.split("/v1/files/")[1].split(")")[0]
+    path, mime, size = store.get(digest)
+    with open(path, "rb") as f:
+        return f.read(), mime
+
+
+@pytest.mark.parametrize("split", [1, 3, 4, 5, 7, 1000])
+def test_image_split_across_chunks_is_decoded(store, split):
+    data = os.urandom(257)
+    text = f"a ![pic](data:image/png;base64,{base64.b64encode(data).decode()}) b"
+    chunks = [text[i:i + split] for i in range(0, len(text), split)]
+    output = run(InlineImageOffloader(store, "http://host/"), chunks)
+
+    assert output.startswith("a ![pic](http://host/v1/files/")
+    assert output.endswith(") b")
+    assert stored_bytes(store, output) == (data, "image/png")
+
+
+def test_identical_images_share_one_file(store):
+    url = f"![](data:image/png;base64,{base64.b64encode(b'same').decode()})"
+    first = run(InlineImageOffloader(store, "http://host"), [url])
+    second = run(InlineImageOffloader(store, "http://host"), [url])
+    assert first == second
+    assert len(store.entries) == 1
+
+
+def test_non_image_markdown_passes_through(store):
+    offloader = InlineImageOffloader(store, "http://host")
+    text = ["a ![x](http://e.com/a.png) b!", "[", "no]", " ok!", " ![alt\nmore"]
+    assert run(offloader, text) == "".join(text)
+    assert not store.entries
+
+
+@pytest.mark.parametrize("mime", ["svg+xml", "x-icon", "pngx"])
+def test_non_raster_image_passes_through(store, mime):
+    offloader = InlineImageOffloader(store, "http://host")
+    text = f"a ![x](data:image/{mime};base64,{base64.b64encode(b'<svg/>').decode()}) b"
+    assert run(offloader, [text[:14], text[14:]]) == text
+    assert not store.entries
+    assert offloader.pending == ""
+
+
+@pytest.mark.parametrize("payload", ["abc$d==e", "abcd==ef", "abcde"])
+def test_malformed_base64_passes_original_text_through(store, payload):
+    text = f"x ![](data:image/png;base64,{payload}) y"
+    assert run(InlineImageOffloader(store, "http://host"), [text[:20], text[20:]]) == text
+    assert not store.entries
+    assert not os.listdir(store.directory)
+
+
+def test_late_base64_error_rebuilds_text_without_buffering(store):
+    offloader = InlineImageOffloader(store, "http://host")
+    valid = base64.b64encode(os.urandom(3000)).decode()
+    text = f"x ![](data:image/png;base64,{valid}$AAA) y"
+    chunks = [text[i:i + 100] for i in range(0, len(text), 100)]
+    output = []
+    for chunk in chunks:
+        output.append(offloader.feed(chunk))
+        # 转存过程中不保留已接收的base64文本
+        if offloader.image and not offloader.image["failed"]:
+            assert len(offloader.image["remainder"]) < 4
+    output.append(offloader.flush())
+    assert "".join(output) == text
+    assert not os.listdir(store.directory)
+
+
+def test_close_removes_unfinished_temp_file(store):
+    offloader = InlineImageOffloader(store, "http://host")
+    offloader.feed("![](data:image/png;base64,AAAA")
+    assert os.listdir(store.directory)
+    offloader.close()
+    assert not os.listdir(store.directory)
+
+
+def test_store_removes_orphaned_temp_files(tmp_path):
+    (tmp_path / ".tmp-1-2").write_bytes(b"partial")
+    BlobStore(str(tmp_path), 1024, 3600)
+    assert not os.listdir(tmp_path)
+
+
+def test_store_evicts_oldest_over_capacity(tmp_path):
+    store = BlobStore(str(tmp_path), 1000, 3600)
+    outputs = [
+        run(InlineImageOffloader(store, "http://host"), [f"![](data:image/png;base64,{base64.b64encode(os.urandom(600)).decode()})"])
+        for _ in range(3)
+    ]
+    assert len(store.entries) == 1
+    assert stored_bytes(store, outputs[-1])
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("bytes=0-9", (0, 9)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=90-200", (90, 99)),
+    ("bytes=-5", (95, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=9-3", None),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+])
+def test_parse_byte_range(header, expected):
+    assert parse_byte_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=-0"])
+def test_parse_byte_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_byte_range(header, 100)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ("*", True),
+    ('"abcd"', False),
+    ('W/"x"', False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+def test_file_response_is_not_sniffed_or_executed(store, monkeypatch):
+    monkeypatch.setattr(app, "blob_store", store)
+    offloader = InlineImageOffloader(store, "http://host")
+    data = os.urandom(64)
+    output = run(offloader, [f"![p](data:image/jpg;base64,{base64.b64encode(data).decode()})"])
+    digest = output.split("/v1/files/")[1].rstrip(")")
+
+    client = TestClient(app.app)
+    for headers in [{}, {"range": "bytes=0-9"}]:
+        response = client.get(f"/v1/files/{digest}", headers=headers)
+        assert response.headers["content-type"] == "image/jpeg"
+        assert response.headers["x-content-type-options"] == "nosniff"
+        assert "sandbox" in response.headers["content-security-policy"]
@@ -0,0 +1,131 @@
+import asyncio
+import base64
+import io
+from collections import OrderedDict
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+import app
+from app import ChatMessage, cache_image, load_image_source, prepare_messages, process_image
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(app, "image_cache", OrderedDict())
+    monkeypatch.setattr(app, "image_cache_bytes", 0)
+
+
+def to_data_url(image, format="PNG", **params):
+    output = io.BytesIO()
+    image.save(output, format=format, **params)
+    mime = "jpeg" if format == "JPEG" else format.lower()
+    return f"data:image/{mime};base64,{base64.b64encode(output.getvalue()).decode()}"
+
+
+def decode(result):
+    return base64.b64decode(result.split(",", 1)[1])
+
+
+def image_message(*urls):
+    content = [{"type": "text", "text": "看图"}]
+    content += [{"type": "image_url", "image_url": {"url": url}} for url in urls]
+    return ChatMessage(role="user", content=content)
+
+
+def test_downscale_to_max_side():
+    result = process_image(to_data_url(Image.new("RGB", (4000, 1000), (10, 20, 30))), 1000)
+    assert result.startswith("data:image/jpeg;base64,")
+    assert Image.open(io.BytesIO(decode(result))).size == (1000, 250)
+
+
+def test_alpha_flattened_onto_white():
+    result = process_image(to_data_url(Image.new("RGBA", (16, 16), (0, 0, 0, 0))), 1568)
+    image = Image.open(io.BytesIO(decode(result)))
+    assert image.mode == "RGB"
+    assert all(channel > 250 for channel in image.getpixel((8, 8)))
+
+
+def test_small_jpeg_kept_when_smaller():
+    noise = Image.effect_noise((64, 64), 64).convert("RGB")
+    url = to_data_url(noise, "JPEG", quality=30)
+    assert decode(process_image(url, 1568)) == load_image_source(url)
+
+
+def test_exif_orientation_applied():
+    image = Image.effect_noise((40, 20), 64).convert("RGB")
+    exif = image.getexif()
+    exif[0x0112] = 6
+    url = to_data_url(image, "JPEG", quality=30, exif=exif.tobytes())
+    result = Image.open(io.BytesIO(decode(process_image(url, 1568))))
+    assert result.size == (20, 40)
+
+
+def test_max_pixels_rejected(monkeypatch):
+    monkeypatch.setattr(app, "IMAGE_MAX_PIXELS", 100)
+    with pytest.raises(ValueError):
+        process_image(to_data_url(Image.new("RGB", (20, 20))), 1568)
+
+
+def test_cache_is_size_bounded_lru(monkeypatch):
+    monkeypatch.setattr(app, "IMAGE_CACHE_MAX_BYTES", 10)
+    cache_image("a", "aaaa")
+    cache_image("b", "bbbb")
+    app.image_cache.move_to_end("a")
+    cache_image("c", "cccc")
+    assert list(app.image_cache) == ["a", "c"]
+    assert app.image_cache_bytes == 8
+
+    # 超过上限的单个条目不缓存
+    cache_image("d", "d" * 11)
+    assert "d" not in app.image_cache
+
+
+def test_images_rejected_without_upstream_field(monkeypatch):
+    monkeypatch.setattr(app, "IMAGE_UPSTREAM_FIELD", "")
+    url = to_data_url(Image.new("RGB", (8, 8)))
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(prepare_messages([image_message(url)], "gpt-4o"))
+    assert excinfo.value.status_code == 400
+
+    # 空地址的image_url不算图片
+    prepared, images = asyncio.run(prepare_messages([image_message("")], "gpt-4o"))
+    assert prepared[0].content == "看图"
+    assert images == []
+
+
+def test_duplicate_images_processed_once(monkeypatch):
+    monkeypatch.setattr(app, "IMAGE_UPSTREAM_FIELD", "images")
+    calls = []
+
+    def fake_process_image(url, max_side):
+        calls.append(url)
+        return "processed:" + url
+
+    monkeypatch.setattr(app, "process_image", fake_process_image)
+    url = to_data_url(Image.new("RGB", (8, 8)))
+    remote = "https://example.com/a.png"
+    messages = [image_message(url, remote), image_message(url)]
+    prepared, images = asyncio.run(prepare_messages(messages, "gpt-4o"))
+    assert calls == [url]
+    assert images == ["processed:" + url, remote, "processed:" + url]
+    assert [msg.content for msg in prepared] == ["看图", "看图"]
+
+
+def test_local_path_confined_to_image_dir(monkeypatch, tmp_path):
+    image_dir = tmp_path / "images"
+    image_dir.mkdir()
+    (image_dir / "a.png").write_bytes(b"inside")
+    (tmp_path / "secret.png").write_bytes(b"outside")
+
+    monkeypatch.setattr(app, "IMAGE_LOCAL_DIR", "")
+    with pytest.raises(ValueError):
+        load_image_source("a.png")
+
+    monkeypatch.setattr(app, "IMAGE_LOCAL_DIR", str(image_dir))
+    assert load_image_source("a.png") == b"inside"
+    assert load_image_source(f"file://{image_dir}/a.png") == b"inside"
+    for path in ["../secret.png", str(tmp_path / "secret.png"), f"file://{tmp_path}/secret.png"]:
+        with pytest.raises(ValueError):
+            load_image_source(path)
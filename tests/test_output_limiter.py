@@ -0,0 +1,77 @@
+from app import OutputLimiter
+
+
+def run(limiter, chunks):
+    output = "".join(limiter.feed(chunk) for chunk in chunks)
+    return output + limiter.flush()
+
+
+def test_no_limits_passes_everything_through():
+    limiter = OutputLimiter()
+    assert run(limiter, ["hello ", "world"]) == "hello world"
+    assert limiter.finish_reason is None
+
+
+def test_stop_sequence_within_chunk():
+    limiter = OutputLimiter(stop="END")
+    assert run(limiter, ["abc END def"]) == "abc "
+    assert limiter.finish_reason == "stop"
+
+
+def test_stop_sequence_spanning_chunks():
+    limiter = OutputLimiter(stop=["END", "\n\n"])
+    assert run(limiter, ["hello E", "N", "D world"]) == "hello "
+    assert limiter.finish_reason == "stop"
+
+
+def test_earliest_stop_sequence_wins():
+    limiter = OutputLimiter(stop=["zz", "b"])
+    assert run(limiter, ["a", "bzz"]) == "a"
+
+
+def test_partial_stop_prefix_is_flushed_at_end():
+    limiter = OutputLimiter(stop="xyz")
+    assert run(limiter, ["ab", "xy"]) == "abxy"
+    assert limiter.finish_reason is None
+
+
+def test_feed_after_stop_returns_nothing():
+    limiter = OutputLimiter(stop="!")
+    limiter.feed("hi!")
+    assert limiter.feed("more") == ""
+    assert limiter.flush() == ""
+
+
+def test_max_tokens_truncates_at_exact_position():
+    # 非CJK字符按4个字符一个token估算
+    limiter = OutputLimiter(max_tokens=2)
+    assert run(limiter, ["abcd", "efghij"]) == "abcdefgh"
+    assert limiter.finish_reason == "length"
+    assert limiter.usage_tokens == 2
+
+
+def test_max_tokens_counts_cjk_characters_as_one_token():
+    limiter = OutputLimiter(max_tokens=3)
+    assert run(limiter, ["你好世界"]) == "你好世"
+    assert limiter.finish_reason == "length"
+
+
+def test_max_tokens_reached_exactly_at_chunk_end():
+    limiter = OutputLimiter(max_tokens=1)
+    assert limiter.feed("abcd") == "abcd"
+    assert limiter.finish_reason == "length"
+
+
+def test_length_before_stop_reports_length():
+    limiter = OutputLimiter(stop="STOP", max_tokens=1)
+    assert run(limiter, ["abcdefSTOP"]) == "abcd"
+    assert limiter.finish_reason == "length"
+
+
+def test_reasoning_counts_toward_max_tokens():
+    limiter = OutputLimiter(stop="abc", max_tokens=1)
+    # 思维链不参与stop匹配
+    assert limiter.feed_reasoning("ab") == "ab"
+    assert limiter.feed_reasoning("cdef") == "cd"
+    assert limiter.finish_reason == "length"
+    assert limiter.feed("content") == ""
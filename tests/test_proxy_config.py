@@ -0,0 +1,89 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+from app import MODEL_MAPPING, ProxyConfig, reload_config
+
+
+def test_defaults():
+    config = ProxyConfig()
+    assert config.model_mapping == MODEL_MAPPING
+    assert config.request_timeout > 0
+    models = json.loads(config.models_response)
+    assert [m["id"] for m in models["data"]] == list(MODEL_MAPPING)
+
+
+@pytest.mark.parametrize("data", [
+    [1],
+    {"model_mapping": []},
+    {"model_mapping": {}},
+    {"api_base": "ftp://example.com"},
+    {"request_timeout": 0},
+    {"request_timeout": -1},
+    {"request_timeout": "abc"},
+    {"pool_connections": 0},
+    {"pool_maxsize": -1},
+])
+def test_invalid_config_rejected(data):
+    with pytest.raises((ValueError, TypeError)):
+        ProxyConfig(data)
+
+
+def test_reload_swaps_config_and_keeps_old_on_error(monkeypatch):
+    monkeypatch.setattr(app, "PROXY_CONFIG", ProxyConfig())
+    reload_config({"model_mapping": {"m1": "x/m1"}})
+    assert app.PROXY_CONFIG.model_mapping == {"m1": "x/m1"}
+
+    with pytest.raises(ValueError):
+        reload_config({"request_timeout": -1})
+    assert app.PROXY_CONFIG.model_mapping == {"m1": "x/m1"}
+
+    # 空对象表示使用内置默认值，而不是重新读取配置文件
+    monkeypatch.setattr(app, "CONFIG_FILE", "/nonexistent/config.json")
+    reload_config({})
+    assert app.PROXY_CONFIG.model_mapping == MODEL_MAPPING
+
+
+def test_retired_session_closed_after_last_user(monkeypatch):
+    old_config = ProxyConfig()
+    closed = []
+    monkeypatch.setattr(old_config.session, "close", lambda: closed.append(True))
+    monkeypatch.setattr(app, "PROXY_CONFIG", old_config)
+
+    config = app.PROXY_CONFIG.acquire()
+    reload_config({})
+    assert app.PROXY_CONFIG is not old_config
+    assert not closed
+
+    config.release()
+    assert closed == [True]
+
+    # 没有进行中的请求时替换后立即关闭
+    idle_config = app.PROXY_CONFIG
+    monkeypatch.setattr(idle_config.session, "close", lambda: closed.append(True))
+    reload_config({})
+    assert closed == [True, True]
+
+
+def test_reload_endpoint_requires_admin_key(monkeypatch):
+    monkeypatch.setattr(app, "PROXY_CONFIG", ProxyConfig())
+    monkeypatch.setattr(app, "CONFIG_FILE", "/nonexistent/config.json")
+    client = TestClient(app.app)
+
+    def post(key, body):
+        return client.post("/admin/reload", headers={"authorization": f"Bearer {key}"}, content=body)
+
+    monkeypatch.setattr(app, "ADMIN_KEY", "")
+    assert post("anything", "").status_code == 403
+
+    monkeypatch.setattr(app, "ADMIN_KEY", "secret")
+    assert post("wrong", "").status_code == 401
+    for body in ["[1]", '"text"', "{bad json", '{"request_timeout": 0}']:
+        assert post("secret", body).status_code == 400
+
+    response = post("secret", json.dumps({"model_mapping": {"m1": "x/m1"}}))
+    assert response.status_code == 200
+    assert response.json()["models"] == ["m1"]
+    assert app.PROXY_CONFIG.model_mapping == {"m1": "x/m1"}